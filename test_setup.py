@@ -5,93 +5,192 @@ This script verifies that all required dependencies are installed and working.
 """
 
 import sys
+import importlib.util
+from importlib.machinery import PathFinder
 import subprocess
-import tkinter as tk
-from tkinter import messagebox
-import json
 from pathlib import Path
 import os
+import io
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 def test_python_version():
     """Test if Python version is compatible"""
     print("Testing Python version...")
-    version = sys.version_info
-    if version.major >= 3 and version.minor >= 6:
-        print(f"✓ Python {version.major}.{version.minor}.{version.micro} is compatible")
+    ver = sys.version_info
+    version_str = f"{ver.major}.{ver.minor}.{ver.micro}"
+    if ver >= (3, 9):
+        print(f"✓ Python {version_str} is compatible")
         return True
     else:
-        print(f"✗ Python {version.major}.{version.minor}.{version.micro} is too old. Need Python 3.6+")
+        print(f"✗ Python {version_str} is too old. Need Python 3.9+")
         return False
 
-def test_tkinter():
-    """Test if tkinter is available"""
-    print("Testing tkinter availability...")
+# Resolved once so a missing tkinter is reported without an import attempt
+TKINTER_SPEC = importlib.util.find_spec('tkinter')
+
+@lru_cache(maxsize=None)
+def _probe_tk():
+    """Create and destroy a Tk root once, returning the error if any"""
+    if TKINTER_SPEC is None:
+        return ImportError("No module named 'tkinter'")
     try:
-        # Try to create a simple window
+        import tkinter as tk
         root = tk.Tk()
         root.withdraw()  # Hide the window
         root.destroy()
+        return None
+    except Exception as e:
+        return e
+
+def test_tkinter():
+    """Test if tkinter is available"""
+    print("Testing tkinter availability...")
+    # Reuse the cached probe so the Tcl interpreter is only started once
+    error = _probe_tk()
+    if error is None:
         print("✓ tkinter is available")
         return True
-    except Exception as e:
-        print(f"✗ tkinter is not available: {e}")
+    else:
+        print(f"✗ tkinter is not available: {error}")
         return False
 
+def _which_all(tools):
+    """Locate several executables with a single listing per PATH folder"""
+    if os.name == 'nt':
+        exts = [''] + os.environ.get('PATHEXT', '.EXE').lower().split(os.pathsep)
+    else:
+        exts = ['']
+    found = {}
+    for folder in os.environ.get('PATH', os.defpath).split(os.pathsep):
+        if not folder:
+            continue
+        try:
+            names = {name.lower() if os.name == 'nt' else name
+                     for name in os.listdir(folder)}
+        except OSError:
+            continue
+        for tool in tools:
+            if tool in found:
+                continue
+            for ext in exts:
+                candidate = os.path.join(folder, tool + ext)
+                if tool + ext in names and os.access(candidate, os.X_OK) \
+                        and not os.path.isdir(candidate):
+                    found[tool] = candidate
+                    break
+        if len(found) == len(tools):
+            break
+    return found
+
 def test_ffmpeg():
     """Test if FFmpeg is installed and accessible"""
     print("Testing FFmpeg installation...")
-    try:
-        # Test ffmpeg command
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, check=True)
-        
-        # Extract version info
-        version_line = result.stdout.split('\n')[0]
-        print(f"✓ FFmpeg found: {version_line}")
-        
-        # Test ffprobe command
-        result = subprocess.run(['ffprobe', '-version'], 
-                              capture_output=True, text=True, check=True)
-        print("✓ FFprobe is available")
-        
-        return True
+    
+    # Resolve both tools in one PATH walk without spawning any processes
+    found = _which_all(('ffmpeg', 'ffprobe'))
+    ffmpeg_path = found.get('ffmpeg')
+    ffprobe_path = found.get('ffprobe')
+    
+    if ffmpeg_path is None:
+        print("✗ FFmpeg not found. Please install FFmpeg and add it to PATH")
+        return False
         
-    except subprocess.CalledProcessError as e:
-        print(f"✗ FFmpeg command failed: {e}")
+    # Run ffmpeg once and read only the first line of the version banner
+    process = subprocess.Popen([ffmpeg_path, '-version'], stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    version_line = process.stdout.readline().strip()
+    process.stdout.close()
+    process.wait()
+    
+    # Closing the pipe early may cut ffmpeg off, so judge by the banner
+    if not version_line:
+        print("✗ FFmpeg command failed: no version output")
         return False
-    except FileNotFoundError:
-        print("✗ FFmpeg not found. Please install FFmpeg and add it to PATH")
+    print(f"✓ FFmpeg found: {version_line}")
+        
+    if ffprobe_path is None:
+        print("✗ FFprobe not found. Please install FFmpeg and add it to PATH")
         return False
+    print("✓ FFprobe is available")
+    
+    return True
+
+# Kept as a tuple so the report is printed in a stable order
+REQUIRED_MODULES = (
+    'threading', 'subprocess', 'json', 'pathlib', 
+    'datetime', 'queue', 'os', 'sys'
+)
 
 def test_required_modules():
     """Test if all required Python modules are available"""
     print("Testing required Python modules...")
     
-    required_modules = [
-        'threading', 'subprocess', 'json', 'pathlib', 
-        'datetime', 'queue', 'os', 'sys'
-    ]
-    
     missing_modules = []
+    builtin_modules = sys.builtin_module_names
     
-    for module in required_modules:
-        try:
-            __import__(module)
+    for module in REQUIRED_MODULES:
+        # Resolve the module spec only; avoids running module init code.
+        # PathFinder skips the rest of the meta path; the full lookup is
+        # only needed as a fallback for frozen or otherwise special modules.
+        ok = (module in sys.modules
+              or module in builtin_modules
+              or PathFinder.find_spec(module) is not None
+              or importlib.util.find_spec(module) is not None)
+        
+        if ok:
             print(f"✓ {module} is available")
-        except ImportError:
+        else:
             print(f"✗ {module} is missing")
             missing_modules.append(module)
     
     return len(missing_modules) == 0
 
+def _scan_entries(path):
+    """Return a name -> DirEntry mapping for a folder (empty if unreadable)"""
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name: entry for entry in entries}
+    except OSError:
+        return {}
+
+def _find_entry(entries, *parts):
+    """Follow parts down from scanned entries, one scandir per folder level"""
+    entry = None
+    for depth, part in enumerate(parts):
+        entry = entries.get(part)
+        if entry is None:
+            return None
+        if depth < len(parts) - 1:
+            if not entry.is_dir():
+                return None
+            entries = _scan_entries(entry.path)
+    return entry
+
+def _can_write_probe(folder):
+    """Fall back to a real write for filesystems that misreport W_OK (e.g. SMB)"""
+    test_file = folder / "test_write_permission.tmp"
+    try:
+        test_file.write_text("test")
+        test_file.unlink()  # Delete test file
+        return True
+    except Exception:
+        return False
+
 def test_file_permissions():
     """Test file system permissions"""
     print("Testing file system permissions...")
     
+    home = Path.home()
+    # Scan the home folder once; DirEntry caches the type information
+    home_entries = _scan_entries(home)
+    
     # Test read permissions on DCIM folder
-    dcim_path = Path.home() / "OneDrive" / "Pictures" / "DCIM"
-    if dcim_path.exists():
-        if dcim_path.is_dir() and os.access(dcim_path, os.R_OK):
+    dcim_path = home / "OneDrive" / "Pictures" / "DCIM"
+    dcim_entry = _find_entry(home_entries, "OneDrive", "Pictures", "DCIM")
+    if dcim_entry is not None:
+        if dcim_entry.is_dir() and os.access(dcim_path, os.R_OK):
             print(f"✓ Can read from DCIM folder: {dcim_path}")
         else:
             print(f"✗ Cannot read from DCIM folder: {dcim_path}")
@@ -101,15 +200,13 @@ def test_file_permissions():
         print("  You can still use the application by selecting a different folder")
     
     # Test write permissions on Desktop
-    desktop_path = Path.home() / "Desktop"
-    if desktop_path.exists():
-        test_file = desktop_path / "test_write_permission.tmp"
-        try:
-            test_file.write_text("test")
-            test_file.unlink()  # Delete test file
+    desktop_path = home / "Desktop"
+    desktop_entry = home_entries.get("Desktop")
+    if desktop_entry is not None and desktop_entry.is_dir():
+        if os.access(desktop_path, os.W_OK) or _can_write_probe(desktop_path):
             print(f"✓ Can write to Desktop: {desktop_path}")
-        except Exception as e:
-            print(f"✗ Cannot write to Desktop: {e}")
+        else:
+            print(f"✗ Cannot write to Desktop: {desktop_path}")
             return False
     else:
         print("! Desktop folder not found at expected location")
@@ -117,31 +214,91 @@ def test_file_permissions():
     
     return True
 
+class _BufferedStdout:
+    """Stdout proxy that routes print() output to a per-thread buffer"""
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+        
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+        
+    def flush(self):
+        self.stream.flush()
+        
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        
+    def release(self):
+        buffer = self._local.buffer
+        self._local.buffer = None
+        return buffer.getvalue()
+
+def _run_captured(buffered, test_func):
+    """Run a test with its output captured, returning (result, output)"""
+    buffered.capture()
+    try:
+        result = test_func()
+    except Exception as e:
+        print(f"✗ Test failed with error: {e}")
+        result = False
+    return result, buffered.release()
+
+TESTS = (
+    ("Python Version", test_python_version),
+    ("Tkinter GUI", test_tkinter),
+    ("FFmpeg Installation", test_ffmpeg),
+    ("Required Modules", test_required_modules),
+    ("File Permissions", test_file_permissions)
+)
+
+# Help text for failed tests, keyed by test name
+HELP = {
+    "Python Version": "- Python too old: Install Python 3.9+ from https://www.python.org/",
+    "Tkinter GUI": "- Tkinter not available: Install python3-tk package (Linux)",
+    "FFmpeg Installation": "- FFmpeg not found: Install from https://ffmpeg.org/download.html",
+    "File Permissions": "- Permission issues: Run as administrator or change folders",
+}
+
+# Tests that must not run on a worker thread
+MAIN_THREAD_TESTS = (test_tkinter,)
+
 def main():
     """Main test function"""
     print("=" * 60)
     print("Video Converter Setup Test")
     print("=" * 60)
     
-    tests = [
-        ("Python Version", test_python_version),
-        ("Tkinter GUI", test_tkinter),
-        ("FFmpeg Installation", test_ffmpeg),
-        ("Required Modules", test_required_modules),
-        ("File Permissions", test_file_permissions)
-    ]
-    
     results = []
+    outcomes = {}
     
-    for test_name, test_func in tests:
+    # Run the independent probes concurrently. Tk stays on the main thread
+    # because Tcl is not thread-safe.
+    buffered = _BufferedStdout(sys.stdout)
+    sys.stdout = buffered
+    try:
+        with ThreadPoolExecutor(max_workers=len(TESTS)) as executor:
+            futures = {
+                test_name: executor.submit(_run_captured, buffered, test_func)
+                for test_name, test_func in TESTS
+                if test_func not in MAIN_THREAD_TESTS
+            }
+            for test_name, test_func in TESTS:
+                if test_func in MAIN_THREAD_TESTS:
+                    outcomes[test_name] = _run_captured(buffered, test_func)
+            for test_name, future in futures.items():
+                outcomes[test_name] = future.result()
+    finally:
+        sys.stdout = buffered.stream
+    
+    # Print each test's buffered output in the original order
+    for test_name, test_func in TESTS:
+        result, output = outcomes[test_name]
         print(f"\n{test_name}:")
         print("-" * 40)
-        try:
-            result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"✗ Test failed with error: {e}")
-            results.append((test_name, False))
+        print(output, end="")
+        results.append((test_name, result))
     
     # Summary
     print("\n" + "=" * 60)
@@ -165,11 +322,11 @@ def main():
     else:
         print(f"\n⚠️  {total - passed} test(s) failed. Please address the issues above.")
         
-        # Provide specific help for common issues
+        # Provide specific help for the tests that failed
         print("\nCommon solutions:")
-        print("- FFmpeg not found: Install from https://ffmpeg.org/download.html")
-        print("- Tkinter not available: Install python3-tk package (Linux)")
-        print("- Permission issues: Run as administrator or change folders")
+        for test_name, result in results:
+            if not result and test_name in HELP:
+                print(HELP[test_name])
     
     print("\nPress Enter to exit...")
     input()
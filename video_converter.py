@@ -9,11 +9,545 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import time
 import subprocess
 import json
+import tempfile
+import shutil
 from pathlib import Path
-from datetime import datetime
 import queue
+import multiprocessing
+from array import array
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+try:
+    import av  # Optional (PyAV): probes files in-process instead of via ffprobe
+except ImportError:
+    av = None
+
+try:
+    # Optional: parses JSON several times faster than json, straight from bytes
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Resolved once, so starting each ffmpeg or ffprobe process skips the PATH
+# search; the bare names are kept if they are missing so errors still show
+FFMPEG = shutil.which('ffmpeg') or 'ffmpeg'
+FFPROBE = shutil.which('ffprobe') or 'ffprobe'
+
+# Hardware H.264 encoders in order of preference
+HW_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf', 'h264_vaapi')
+
+# Render node used for VAAPI encoding on Linux
+VAAPI_DEVICE = '/dev/dri/renderD128'
+
+# Hardware decoder flags for the matching encoder
+HW_DECODE_ARGS = {
+    'h264_nvenc': ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'],
+    'h264_qsv': ['-hwaccel', 'qsv'],
+    'h264_videotoolbox': ['-hwaccel', 'videotoolbox'],
+    'h264_vaapi': ['-hwaccel', 'vaapi', '-hwaccel_output_format', 'vaapi'],
+}
+
+# Encoders whose decoded frames stay in GPU memory and are scaled there
+HW_FRAME_ENCODERS = frozenset(('h264_nvenc', 'h264_vaapi'))
+
+# Pixel format handed to encoders that take frames from system memory;
+# Quick Sync only accepts nv12 (or p010), which plays the same as yuv420p
+ENCODER_PIX_FMTS = {
+    'h264_qsv': 'nv12',
+}
+
+# Encoder-specific speed/profile flags for the hardware encoders
+HW_ENCODER_ARGS = {
+    'h264_nvenc': ['-preset', 'p4', '-tune', 'hq', '-rc', 'vbr', '-b:v', '0', '-profile:v', 'high'],
+    'h264_qsv': ['-preset', 'medium', '-profile:v', 'high'],
+    'h264_videotoolbox': ['-profile:v', 'high'],
+    'h264_amf': ['-quality', 'balanced', '-rc', 'cqp', '-profile:v', 'high'],
+    'h264_vaapi': ['-profile:v', 'high'],
+}
+
+# Software encoder per output codec; HEVC and AV1 trade encode time for
+# smaller files and always use these
+CODEC_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'av1': 'libsvtav1'}
+
+# Extra flags for the HEVC and AV1 encoders (hvc1 lets Apple players
+# recognise HEVC in MP4)
+SOFTWARE_ENCODER_ARGS = {
+    'libx265': ['-tag:v', 'hvc1'],
+    'libsvtav1': ['-preset', '8'],
+}
+
+# Private options of the HEVC and AV1 encoders. {threads} caps the cores
+# each uses, which plain -threads doesn't, so parallel jobs share the CPU.
+SOFTWARE_ENCODER_PARAMS = {
+    'libx265': ('-x265-params', 'pools={threads}'),
+    'libsvtav1': ('-svtav1-params', 'tune=0:lp={threads}'),
+}
+
+# Quality flags per encoder, roughly matching the libx264 CRF levels
+QUALITY_SETTINGS = {
+    'libx264': {
+        'high': ['-crf', '18'],
+        'medium': ['-crf', '23'],
+        'low': ['-crf', '28']
+    },
+    'libx265': {
+        'high': ['-crf', '20'],
+        'medium': ['-crf', '25'],
+        'low': ['-crf', '30']
+    },
+    'libsvtav1': {
+        'high': ['-crf', '30'],
+        'medium': ['-crf', '35'],
+        'low': ['-crf', '40']
+    },
+    'h264_nvenc': {
+        'high': ['-cq', '20'],
+        'medium': ['-cq', '23'],
+        'low': ['-cq', '26']
+    },
+    'h264_qsv': {
+        'high': ['-global_quality', '20'],
+        'medium': ['-global_quality', '23'],
+        'low': ['-global_quality', '26']
+    },
+    'h264_videotoolbox': {
+        'high': ['-q:v', '65'],
+        'medium': ['-q:v', '55'],
+        'low': ['-q:v', '45']
+    },
+    'h264_amf': {
+        'high': ['-qp_i', '20', '-qp_p', '20'],
+        'medium': ['-qp_i', '23', '-qp_p', '23'],
+        'low': ['-qp_i', '26', '-qp_p', '26']
+    },
+    'h264_vaapi': {
+        'high': ['-qp', '20'],
+        'medium': ['-qp', '23'],
+        'low': ['-qp', '26']
+    },
+}
+
+# H.264 profiles an iPhone plays, so such sources can be stream copied
+COPY_H264_PROFILES = frozenset(('High', 'Main', 'Constrained Baseline', 'Baseline'))
+
+# libx264 speed presets, fastest first
+X264_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+                'medium', 'slow', 'slower', 'veryslow')
+
+# libx264 tunings; 'none' leaves -tune off
+X264_TUNES = ('none', 'film', 'animation', 'grain', 'stillimage', 'fastdecode', 'zerolatency')
+
+# Video file extensions, without the leading dot
+VIDEO_EXTENSIONS = frozenset(('mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm', 'm4v', '3gp'))
+
+# The same extensions with the dot, for a single str.endswith test per name.
+# A precompiled case-insensitive regex was measured at about 30% slower on
+# typical camera file names, since search() scans the whole name for '$'.
+VIDEO_EXT_TUPLE = tuple('.' + ext for ext in sorted(VIDEO_EXTENSIONS))
+
+# Scanned rows are sent to the UI once this many pile up, or after this
+# many seconds, whichever comes first
+SCAN_BATCH_SIZE = 200
+SCAN_BATCH_INTERVAL = 0.1
+
+# The walk pauses while this many batches wait for the UI to take them,
+# so a busy UI slows the scan down instead of letting the queue grow
+SCAN_PENDING_BATCHES = 8
+
+# Rows put in the file list at a time; more are added as it is scrolled to
+# the end, so huge scans don't slow the Treeview down
+TREE_PAGE_SIZE = 1000
+
+# Tcl procedure that inserts a list of rows into a Treeview and returns
+# their item ids, so a page of rows costs one call from Python. Rows are
+# passed as a Tcl list, so file names need no quoting.
+TREE_INSERT_PROC = 'video_converter_insert_rows'
+TREE_INSERT_SCRIPT = """
+proc video_converter_insert_rows {tree rows} {
+    set ids {}
+    foreach row $rows {
+        lappend ids [$tree insert {} end -values $row]
+    }
+    return $ids
+}
+"""
+
+# ffprobe fields used by get_video_info()
+PROBE_ENTRIES = ('format=format_name,duration'
+                 ':stream=codec_type,codec_name,profile,pix_fmt,level,width,height'
+                 ':stream_tags=rotate:stream_side_data=rotation')
+
+# Scanned files handed to each ffprobe task; results come back per chunk
+PROBE_CHUNK_SIZE = 8
+
+# Seconds between saves of the probe cache during a long scan, so a crash
+# or a killed process keeps most of the probes already done
+PROBE_CACHE_SAVE_INTERVAL = 30
+
+# ffprobe spends most of its time starting up and waiting on the disk, so
+# scans run two probes per CPU, up to this many at once
+SCAN_PROBE_WORKERS = 16
+
+# Maximum queued messages handled per UI tick
+LOG_QUEUE_BATCH = 500
+
+# Milliseconds between UI ticks that drain the message queue, and the
+# shorter wait used when a tick leaves messages behind
+UI_UPDATE_INTERVAL = 50
+UI_BUSY_INTERVAL = 16
+
+# Seconds between updates of a converting file's percentage in the list
+ROW_PROGRESS_INTERVAL = 0.5
+
+# Long libx264 encodes are split into time segments encoded in parallel.
+# Segments are at least this many seconds, so only files of twice this
+# length are split, and each segment encoder gets at least this many threads.
+SEGMENT_MIN_LENGTH = 30
+SEGMENT_MIN_THREADS = 2
+
+# Clips shorter than this many seconds are encoded by libx264 with sliced
+# threads and a short lookahead, which reach full speed sooner than the
+# default frame threads and 40-frame lookahead
+SHORT_CLIP_DURATION = 10
+SHORT_CLIP_X264_PARAMS = 'sliced-threads=1:sync-lookahead=0:rc-lookahead=10'
+
+# Up to this many short clips are encoded by one ffmpeg process, which
+# saves the process start and codec setup for each of them
+CLIP_BATCH_SIZE = 8
+
+# Stops ffmpeg and ffprobe from opening a console window on Windows
+NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+def run_probe(args, timeout=None, text=True):
+    """Run a short ffmpeg/ffprobe/nvidia-smi query and return its stdout,
+    as text unless text is False. Raises CalledProcessError if it exits
+    with an error."""
+    # A large pipe buffer reads JSON probe output in one or two syscalls
+    with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          bufsize=1 << 20, creationflags=NO_WINDOW) as process:
+        try:
+            stdout, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout)
+    return stdout.decode('utf-8', 'replace') if text else stdout
+
+def available_cpus():
+    """Number of CPUs this process may run on (respects affinity masks)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on Windows/macOS
+        return os.cpu_count() or 1
+
+@lru_cache(maxsize=None)
+def scale_filters(encoder, hw_frames, resolution):
+    """Video filters for one output: resolution scaling if needed, on the
+    GPU when frames live there. min() keeps videos already below the
+    limit from being upscaled. Cached, since every file of a run asks
+    for the same few combinations."""
+    filters = []
+    if resolution != "Original":
+        width, height = resolution.split('x')
+        size = f"w='min(iw,{width})':h='min(ih,{height})':force_original_aspect_ratio=decrease"
+    if hw_frames and encoder == 'h264_nvenc':
+        if resolution != "Original":
+            filters.append(f'scale_cuda={size}:format=yuv420p')
+        else:
+            filters.append('scale_cuda=format=yuv420p')
+    elif hw_frames and encoder == 'h264_vaapi':
+        if resolution != "Original":
+            filters.append(f'scale_vaapi={size}:format=nv12')
+        else:
+            filters.append('scale_vaapi=format=nv12')
+    else:
+        if resolution != "Original":
+            filters.append(f'scale={size}:force_divisible_by=2')
+        if encoder == 'h264_vaapi':
+            filters.append('format=nv12,hwupload')
+    return tuple(filters)
+
+def iter_video_files(root, suffixes):
+    """Yield DirEntry objects for video files under root using os.scandir.
+    suffixes is a tuple of lower-case extensions with the leading dot."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # Most of a DCIM tree is photos, so the name test
+                        # runs first and they need no type check at all
+                        if entry.name.lower().endswith(suffixes):
+                            if entry.is_file(follow_symlinks=False):
+                                yield entry
+                            elif entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                        elif entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def get_video_info(file_path):
+    """Get video information using PyAV if installed, else ffprobe"""
+    if av is not None:
+        info = get_video_info_av(file_path)
+        if info is not None:
+            return info
+    try:
+        # Only the fields read below, rather than every property of every
+        # stream, keeps ffprobe's output and its parsing small
+        cmd = [
+            FFPROBE, '-v', 'quiet', '-print_format', 'json',
+            '-show_entries', PROBE_ENTRIES, file_path
+        ]
+        # Parsed from the raw bytes, skipping a decode to str
+        info = json_loads(run_probe(cmd, text=False))
+
+        # Extract format information
+        format_info = info.get('format', {})
+        format_name = format_info.get('format_name', 'Unknown')
+        try:
+            duration = float(format_info['duration'])
+        except (KeyError, ValueError):
+            duration = None
+
+        # First video and audio streams, used to decide on stream copy
+        streams = info.get('streams', [])
+        video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+        if video is not None:
+            rotation = video.get('tags', {}).get('rotate', 0)
+            for side_data in video.get('side_data_list', []):
+                rotation = side_data.get('rotation', rotation)
+            video = {
+                'codec': video.get('codec_name'),
+                'profile': video.get('profile'),
+                'pix_fmt': video.get('pix_fmt'),
+                'level': video.get('level', 0),
+                'width': video.get('width', 0),
+                'height': video.get('height', 0),
+                'rotation': int(float(rotation)),
+            }
+        return {'format': format_name.split(',')[0].upper(), 'duration': duration,
+                'video': video, 'audio_codec': audio.get('codec_name') if audio else None}
+
+    except Exception:
+        return {'format': 'Unknown', 'duration': None, 'video': None, 'audio_codec': None}
+
+def get_video_info_av(file_path):
+    """Get video information with PyAV, which saves starting an ffprobe
+    process per file. Returns None to leave the file to ffprobe: when
+    PyAV can't open it, or for H.264 video, whose level and rotation
+    decide stream copy and are only reported reliably by ffprobe."""
+    try:
+        with av.open(file_path) as container:
+            video = container.streams.video[0].codec_context if container.streams.video else None
+            audio = container.streams.audio[0].codec_context if container.streams.audio else None
+            if video is not None and video.name == 'h264':
+                return None
+            if video is not None:
+                # Only H.264 is ever copied, so level and rotation
+                # don't matter for anything else
+                video = {
+                    'codec': video.name,
+                    'profile': getattr(video, 'profile', None),
+                    'pix_fmt': getattr(video, 'pix_fmt', None),
+                    'level': 0,
+                    'width': video.width or 0,
+                    'height': video.height or 0,
+                    'rotation': 0,
+                }
+            duration = container.duration / av.time_base if container.duration else None
+            return {'format': container.format.name.split(',')[0].upper(), 'duration': duration,
+                    'video': video, 'audio_codec': audio.name if audio else None}
+    except Exception:
+        return None
+
+class SettingsManager:
+    """Loads and saves user settings in a JSON file in the home folder"""
+    
+    SECTION = 'settings'
+    
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path.home() / '.dcim_video_converter.json'
+        self._settings = {}
+        
+    def load(self):
+        """Read the settings file once into memory"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = json_loads(f.read() or b'{}')
+        except (OSError, ValueError):
+            return self._settings
+        if isinstance(data, dict) and isinstance(data.get(self.SECTION), dict):
+            self._settings = {key: str(value) for key, value in data[self.SECTION].items()}
+        return self._settings
+        
+    def get(self, key, default=None):
+        return self._settings.get(key, default)
+        
+    def set(self, key, value):
+        self._settings[key] = value
+        
+    def save(self):
+        """Write the in-memory settings back to disk. The file is written
+        under a temporary name and renamed over the old one, so a crash
+        mid-write never leaves it half written."""
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({self.SECTION: self._settings}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+class VideoTable:
+    """Scanned videos stored as parallel columns rather than one dict per
+    file, which keeps large scans compact. Only the first `shown` rows are
+    in the Treeview; item_ids is None for the rest."""
+    
+    def __init__(self, root_len=0):
+        # Paths all start with the source folder, so the name shown for a
+        # file is sliced off its path when displayed instead of stored
+        self.root_len = root_len
+        self.paths = []
+        self.sizes = array('q')  # Bytes; shown in MB
+        self.formats = []
+        self.statuses = []
+        self.item_ids = []
+        self.shown = 0
+        
+    def __len__(self):
+        return len(self.paths)
+        
+    def relative_path(self, i):
+        """Path of row i under the folder that was scanned"""
+        return self.paths[i][self.root_len:]
+        
+    def extend(self, rows):
+        """Add a batch of (path, size, format_name) rows, growing each
+        column once per batch rather than once per row"""
+        if not rows:
+            return
+        paths, sizes, formats = zip(*rows)
+        self.paths.extend(paths)
+        self.sizes.extend(sizes)
+        self.formats.extend(formats)
+        self.statuses.extend(['Ready'] * len(rows))
+        self.item_ids.extend([None] * len(rows))
+
+class ConversionCache:
+    """Remembers which source files were converted successfully, keyed by
+    path, size and modification time, so edited sources are re-encoded"""
+    
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path.home() / '.video_converter_cache.json'
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # One save at a time
+        
+    def load(self):
+        """Read the cache file once into memory"""
+        try:
+            with open(self.path, 'rb') as f:
+                self._entries = json_loads(f.read())
+        except (OSError, ValueError):
+            self._entries = {}
+            
+    def is_converted(self, input_path, input_stat, output_file):
+        """True if input is unchanged since it was converted to output_file
+        and the output still has the size it was written with"""
+        entry = self._entries.get(str(input_path))
+        if entry is None or entry[:2] != [input_stat.st_size, input_stat.st_mtime_ns]:
+            return False
+        try:
+            return os.stat(output_file).st_size == entry[2]
+        except OSError:
+            return False
+            
+    def record(self, input_path, input_stat, output_file):
+        """Remember a successful conversion"""
+        entry = [input_stat.st_size, input_stat.st_mtime_ns, os.stat(output_file).st_size]
+        with self._lock:
+            self._entries[str(input_path)] = entry
+            
+    def save(self):
+        """Write the cache back to disk. The file is replaced atomically, so
+        a crash mid-save keeps the previous record of converted files."""
+        with self._lock:
+            data = json.dumps(self._entries)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with self._write_lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+
+class ProbeCache:
+    """ffprobe results kept between runs so rescans skip the probe, keyed by
+    path and checked against size and modification time"""
+    
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path.home() / '.video_converter_probe_cache.json'
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # One save at a time
+        self._changed = False
+        
+    def load(self):
+        """Read the cache file once into memory"""
+        try:
+            with open(self.path, 'rb') as f:
+                self._entries = json_loads(f.read())
+        except (OSError, ValueError):
+            self._entries = {}
+            
+    def get(self, file_path, file_stat):
+        """Cached video info for an unchanged file, or None"""
+        entry = self._entries.get(file_path)
+        if entry is None or entry[:2] != [file_stat.st_size, file_stat.st_mtime_ns]:
+            return None
+        if len(entry) != 3:
+            return None  # Written by an older version without stream details
+        return entry[2]
+        
+    def record(self, file_path, file_stat, video_info):
+        """Remember the probe result for a file"""
+        entry = [file_stat.st_size, file_stat.st_mtime_ns, video_info]
+        with self._lock:
+            self._entries[file_path] = entry
+            self._changed = True
+            
+    def prune(self, prefix, seen):
+        """Forget files under prefix that a scan no longer found"""
+        with self._lock:
+            stale = [path for path in self._entries
+                     if path.startswith(prefix) and path not in seen]
+            for path in stale:
+                del self._entries[path]
+            if stale:
+                self._changed = True
+                
+    def save(self):
+        """Write the cache back to disk if anything changed. Scans save
+        while they run, so the file is replaced atomically rather than
+        truncated and rewritten."""
+        with self._lock:
+            if not self._changed:
+                return
+            data = json.dumps(self._entries)
+            self._changed = False
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with self._write_lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
 
 class VideoConverter:
     def __init__(self, root):
@@ -21,19 +555,49 @@ class VideoConverter:
         self.root.title("Video Converter for iPhone")
         self.root.geometry("800x600")
         
-        # Queue for thread communication
-        self.log_queue = queue.Queue()
+        # Queue for thread communication; SimpleQueue is a C type that
+        # puts without the condition variable queue.Queue locks each time
+        self.log_queue = queue.SimpleQueue()
         
         # Variables
         self.source_folder = tk.StringVar()
         self.output_folder = tk.StringVar()
-        self.video_files = []
+        self.video_files = VideoTable()
         self.is_converting = False
+        self.is_scanning = False
         self.conversion_thread = None
+        self.hw_encoder = None
+        self.detecting_encoder = False
+        self.active_procs = []
+        self.active_procs_lock = threading.Lock()
+        self.progress_lock = threading.Lock()
+        
+        # Set default paths, overridden by any saved settings
+        self.settings = SettingsManager()
+        self.settings.load()
+        self.source_folder.set(self.settings.get('source_folder',
+            os.path.join(os.path.expanduser("~"), "OneDrive", "Pictures", "DCIM")))
+        self.output_folder.set(self.settings.get('output_folder',
+            os.path.join(os.path.expanduser("~"), "Desktop", "Converted_Videos")))
+        
+        # Record of finished conversions, used to skip unchanged files
+        self.conversion_cache = ConversionCache()
+        self.conversion_cache.load()
+        
+        # ffprobe results from earlier scans
+        self.probe_cache = ProbeCache()
+        self.probe_cache.load()
         
-        # Set default paths
-        self.source_folder.set(os.path.join(os.path.expanduser("~"), "OneDrive", "Pictures", "DCIM"))
-        self.output_folder.set(os.path.join(os.path.expanduser("~"), "Desktop", "Converted_Videos"))
+        # Worker processes that probe files during a scan, if any
+        self.probe_pool = None
+        
+        # Set to stop a running scan; is_scanning only drives the UI
+        self.scan_cancel = threading.Event()
+        
+        # Save folder changes shortly after the user stops editing
+        self._save_after = None
+        self.source_folder.trace_add('write', self.schedule_save)
+        self.output_folder.trace_add('write', self.schedule_save)
         
         self.setup_ui()
         self.check_ffmpeg()
@@ -65,7 +629,17 @@ class VideoConverter:
         ttk.Button(main_frame, text="Browse", command=self.browse_output).grid(row=2, column=2, pady=5)
         
         # Scan button
-        ttk.Button(main_frame, text="Scan for Videos", command=self.scan_videos).grid(row=3, column=0, columnspan=3, pady=20)
+        scan_frame = ttk.Frame(main_frame)
+        scan_frame.grid(row=3, column=0, columnspan=3, pady=20)
+        self.scan_button = ttk.Button(scan_frame, text="Scan for Videos", command=self.scan_videos)
+        self.scan_button.grid(row=0, column=0)
+        
+        # Quick scans list files by extension and leave ffprobe to the
+        # conversion, which probes any file the cache doesn't know
+        self.quick_scan_var = tk.BooleanVar(value=self.settings.get('quick_scan', 'no') == 'yes')
+        ttk.Checkbutton(scan_frame, text="Quick scan (skip ffprobe)",
+                        variable=self.quick_scan_var).grid(row=0, column=1, padx=(20, 0))
+        self.quick_scan_var.trace_add('write', self.schedule_save)
         
         # Video list frame
         list_frame = ttk.LabelFrame(main_frame, text="Found Videos", padding="10")
@@ -88,13 +662,15 @@ class VideoConverter:
         self.video_tree.column('Size', width=80)
         self.video_tree.column('Format', width=80)
         self.video_tree.column('Status', width=120)
+        self.video_tree.tk.eval(TREE_INSERT_SCRIPT)
         
         # Scrollbar for treeview
-        tree_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.video_tree.yview)
-        self.video_tree.configure(yscrollcommand=tree_scrollbar.set)
+        self.tree_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.video_tree.yview)
+        self.video_tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.tree_limit = TREE_PAGE_SIZE
         
         self.video_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        tree_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
         # Conversion options frame
         options_frame = ttk.LabelFrame(main_frame, text="Conversion Options", padding="10")
@@ -113,7 +689,63 @@ class VideoConverter:
         resolution_combo = ttk.Combobox(options_frame, textvariable=self.resolution_var,
                                       values=["3840x2160", "1920x1080", "1280x720", "854x480"], 
                                       state="readonly", width=15)
-        resolution_combo.grid(row=0, column=3, sticky=tk.W)
+        resolution_combo.grid(row=0, column=3, sticky=tk.W, padx=(0, 20))
+        
+        # Hardware encoding override, remembered between sessions
+        self.force_software_var = tk.BooleanVar(value=self.settings.get('force_software', 'no') == 'yes')
+        ttk.Checkbutton(options_frame, text="Force software encoding",
+                        variable=self.force_software_var).grid(row=0, column=4, sticky=tk.W)
+        self.force_software_var.trace_add('write', self.schedule_save)
+        
+        # Number of files converted at the same time
+        ttk.Label(options_frame, text="Parallel Jobs:").grid(row=1, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        # A count chosen in the spinbox, now or in an earlier session, is
+        # kept and saved; otherwise encoder detection picks the default
+        saved_jobs = self.settings.get('parallel_jobs', '')
+        self.jobs_chosen = saved_jobs.isdigit() and int(saved_jobs) >= 1
+        self.max_concurrent_var = tk.IntVar(
+            value=min(int(saved_jobs), max(available_cpus(), 2)) if self.jobs_chosen else 1)
+        ttk.Spinbox(options_frame, from_=1, to=max(available_cpus(), 2),
+                    textvariable=self.max_concurrent_var, state="readonly",
+                    command=self.on_jobs_changed,
+                    width=13).grid(row=1, column=1, sticky=tk.W, pady=(10, 0))
+        
+        # libx264 speed/quality trade-off (hardware encoders ignore these)
+        ttk.Label(options_frame, text="Speed:").grid(row=1, column=2, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.speed_var = tk.StringVar(value=self.settings.get('speed', 'veryfast'))
+        ttk.Combobox(options_frame, textvariable=self.speed_var, values=X264_PRESETS,
+                     state="readonly", width=15).grid(row=1, column=3, sticky=tk.W, pady=(10, 0))
+        
+        ttk.Label(options_frame, text="Tune:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.tune_var = tk.StringVar(value=self.settings.get('tune', 'none'))
+        ttk.Combobox(options_frame, textvariable=self.tune_var, values=X264_TUNES,
+                     state="readonly", width=15).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        
+        # Fragmented MP4 is written in one pass; +faststart rewrites the
+        # whole file afterwards to move the index to the front
+        self.fragmented_var = tk.BooleanVar(value=self.settings.get('fragmented_mp4', 'no') == 'yes')
+        ttk.Checkbutton(options_frame, text="Single-pass MP4 (fragmented)",
+                        variable=self.fragmented_var).grid(row=2, column=2, columnspan=2,
+                                                           sticky=tk.W, pady=(10, 0))
+        
+        self.speed_var.trace_add('write', self.schedule_save)
+        self.tune_var.trace_add('write', self.schedule_save)
+        self.fragmented_var.trace_add('write', self.schedule_save)
+        
+        # Smaller companion copies encoded from the same decode
+        ttk.Label(options_frame, text="Extra Copy:").grid(row=3, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.extra_copy_var = tk.StringVar(value=self.settings.get('extra_copy', 'None'))
+        ttk.Combobox(options_frame, textvariable=self.extra_copy_var,
+                     values=["None", "1280x720", "854x480", "1280x720 + 854x480"],
+                     state="readonly", width=15).grid(row=3, column=1, sticky=tk.W, pady=(10, 0))
+        self.extra_copy_var.trace_add('write', self.schedule_save)
+        
+        # Output codec; HEVC and AV1 give smaller files but encode slower
+        ttk.Label(options_frame, text="Codec:").grid(row=3, column=2, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        self.codec_var = tk.StringVar(value=self.settings.get('codec', 'h264'))
+        ttk.Combobox(options_frame, textvariable=self.codec_var, values=list(CODEC_ENCODERS),
+                     state="readonly", width=15).grid(row=3, column=3, sticky=tk.W, pady=(10, 0))
+        self.codec_var.trace_add('write', self.schedule_save)
         
         # Convert button
         self.convert_button = ttk.Button(main_frame, text="Convert All Videos", 
@@ -145,13 +777,14 @@ class VideoConverter:
         main_frame.rowconfigure(9, weight=1)
         
         # Start log queue processing
+        self._poll_after = None
         self.process_log_queue()
         
     def check_ffmpeg(self):
-        """Check if ffmpeg is installed"""
+        """Check if ffmpeg is installed, then look for a hardware encoder
+        in the background since the test encodes can take several seconds"""
         try:
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-            self.log_message("FFmpeg found and ready to use")
+            run_probe([FFMPEG, '-version'])
         except (subprocess.CalledProcessError, FileNotFoundError):
             messagebox.showerror("FFmpeg Not Found", 
                                "FFmpeg is required for video conversion.\n\n"
@@ -159,7 +792,81 @@ class VideoConverter:
                                "1. Download from https://ffmpeg.org/download.html\n"
                                "2. Add to system PATH\n"
                                "3. Restart this application")
+            return
+        self.log_message("FFmpeg found and ready to use")
+        
+        self.detecting_encoder = True
+        self.ensure_polling()
+        detect_thread = threading.Thread(target=self.detect_encoder_thread)
+        detect_thread.daemon = True
+        detect_thread.start()
+        
+    def detect_encoder_thread(self):
+        """Pick the encoder and a matching default job count off the UI thread"""
+        # libx264 unless a hardware encoder is found; leave each libx264
+        # job a few threads of its own
+        software_jobs = max(1, available_cpus() // 4)
+        encoder, jobs = None, software_jobs
+        try:
+            # Start ffprobe once so its libraries are loaded from disk now
+            # rather than by the first probe of a scan
+            try:
+                run_probe([FFPROBE, '-version'])
+            except (subprocess.CalledProcessError, OSError):
+                pass  # The scan reports probe failures per file
+            encoder = self.detect_hw_encoder()
+            if encoder == 'h264_nvenc':
+                jobs = self.detect_nvenc_sessions()
+            elif encoder:
+                # Consumer GPUs limit the number of concurrent encode sessions
+                jobs = 2
+        except Exception as e:
+            encoder, jobs = None, software_jobs
+            self.log_queue.put(('log', f"Hardware encoder check failed: {str(e)}"))
+        finally:
+            # Always sent, so conversion is never left waiting on detection
+            self.log_queue.put(('encoder_detected', (encoder, jobs)))
+        
+    def detect_hw_encoder(self):
+        """Return the fastest working hardware H.264 encoder, or None"""
+        try:
+            listed = set(run_probe([FFMPEG, '-hide_banner', '-encoders']).split())
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+            
+        for encoder in HW_ENCODERS:
+            if encoder not in listed:
+                continue
+                
+            # Builds often list encoders the hardware can't run, so try a
+            # one-frame test encode before trusting it
+            cmd = [FFMPEG, '-hide_banner', '-v', 'error']
+            if encoder == 'h264_vaapi':
+                cmd.extend(['-vaapi_device', VAAPI_DEVICE])
+            cmd.extend(['-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                        '-frames:v', '1'])
+            if encoder == 'h264_vaapi':
+                cmd.extend(['-vf', 'format=nv12,hwupload'])
+            cmd.extend(['-c:v', encoder, '-f', 'null', '-'])
+            
+            try:
+                run_probe(cmd, timeout=15)
+                return encoder
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                continue
+                
+        return None
             
+    def detect_nvenc_sessions(self):
+        """Return how many NVENC encodes to run at once"""
+        try:
+            run_probe(['nvidia-smi', '--query-gpu=driver_version', '--format=csv,noheader'],
+                      timeout=10)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            return 1
+        # Safe default for the session limit on consumer NVIDIA cards
+        return 3
+        
     def browse_source(self):
         """Browse for source folder"""
         folder = filedialog.askdirectory(title="Select Source Folder", 
@@ -176,70 +883,183 @@ class VideoConverter:
             
     def scan_videos(self):
         """Scan for video files in the source folder"""
+        # A rescan replaces the table the conversion workers are reading
+        if self.is_scanning or self.is_converting:
+            return
+            
         self.log_message("Scanning for video files...")
-        self.video_files = []
         
-        # Clear existing items
-        for item in self.video_tree.get_children():
-            self.video_tree.delete(item)
+        # Clear existing items in a single Tcl call, using the ids the
+        # table already holds rather than asking Tk for them
+        shown = self.video_files.item_ids[:self.video_files.shown]
+        if shown:
+            self.video_tree.delete(*shown)
             
+        # scandir paths all start with the root, so relative paths are a slice
         source_path = Path(self.source_folder.get())
+        base = os.fspath(source_path)
+        prefix = base if base.endswith(os.sep) else base + os.sep
+        self.video_files = VideoTable(len(prefix))
+        self.tree_limit = TREE_PAGE_SIZE
+            
         if not source_path.exists():
             messagebox.showerror("Error", "Source folder does not exist!")
             return
             
-        # Video file extensions
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v', '.3gp'}
+        # Walk the folder in the background; rows arrive via the log queue
+        self.scan_slots = threading.Semaphore(SCAN_PENDING_BATCHES)
+        self.scan_cancel.clear()
+        self.is_scanning = True
+        self.ensure_polling()
+        self.scan_button.config(state='disabled')
+        scan_thread = threading.Thread(target=self.scan_videos_thread,
+                                       args=(prefix, not self.quick_scan_var.get()))
+        scan_thread.daemon = True
+        scan_thread.start()
         
-        # Recursively find video files
-        for file_path in source_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in video_extensions:
-                try:
-                    # Get file size in MB
-                    size_mb = file_path.stat().st_size / (1024 * 1024)
-                    
-                    # Get video info
-                    video_info = self.get_video_info(str(file_path))
-                    format_info = video_info.get('format', 'Unknown')
-                    
-                    # Add to list
-                    self.video_files.append({
-                        'path': str(file_path),
-                        'size': size_mb,
-                        'format': format_info,
-                        'status': 'Ready'
-                    })
-                    
-                    # Add to treeview
-                    relative_path = str(file_path.relative_to(source_path))
-                    self.video_tree.insert('', 'end', values=(
-                        relative_path,
-                        f"{size_mb:.1f}",
-                        format_info,
-                        'Ready'
-                    ))
+    def scan_videos_thread(self, prefix, probe=True):
+        """Find video files under prefix, the source folder ending in a
+        separator, and post them to the UI in batches. Without probe, only
+        formats already in the probe cache replace the extensions."""
+        pending_rows = []
+        pending_stats = []
+        row_count = 0
+        last_flush = time.monotonic()
+        seen = set()
+        cancel = self.scan_cancel
+        last_cache_save = time.monotonic()
+        
+        # ffprobe runs alongside the walk; rows first show the extension as
+        # their format and are upgraded as the probes finish
+        workers = min(SCAN_PROBE_WORKERS, available_cpus() * 2)
+        
+        try:
+            # Parsing ffprobe's JSON, or PyAV's demuxing, holds the GIL, so on
+            # machines with cores to spare the probes run in worker processes.
+            # They are spawned rather than forked, since forking while the Tk
+            # and probe threads run can deadlock the child
+            if probe and available_cpus() >= 8:
+                self.probe_pool = ProcessPoolExecutor(max_workers=min(8, available_cpus()),
+                                                      mp_context=multiprocessing.get_context('spawn'))
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
                     
-                except Exception as e:
-                    self.log_message(f"Error processing {file_path}: {str(e)}")
+                    def flush_rows():
+                        nonlocal pending_rows, pending_stats, row_count, last_cache_save
+                        if cancel.is_set():
+                            return
+                        self.scan_slots.acquire()  # Released once the UI adds the rows
+                        self.log_queue.put(('add_tree_items', pending_rows))
+                        # Probe only after the rows are queued so updates never
+                        # reach the UI ahead of the rows they refer to
+                        # Smaller chunks for small batches so every worker gets some
+                        files = [(row[0], file_stat) for row, file_stat in zip(pending_rows, pending_stats)]
+                        chunk = max(1, min(PROBE_CHUNK_SIZE, -(-len(files) // workers)))
+                        for offset in range(0, len(files), chunk):
+                            executor.submit(self.probe_video_formats, row_count + offset,
+                                            files[offset:offset + chunk], probe)
+                        row_count += len(pending_rows)
+                        pending_rows = []
+                        pending_stats = []
+                        self.log_queue.put(('status', f"Scanning... {row_count} videos found"))
+                        
+                        if time.monotonic() - last_cache_save >= PROBE_CACHE_SAVE_INTERVAL:
+                            last_cache_save = time.monotonic()
+                            try:
+                                self.probe_cache.save()
+                            except OSError as e:
+                                self.log_queue.put(('log', f"Could not save probe cache: {str(e)}"))
+                        
+                    # Recursively find video files
+                    for count, entry in enumerate(iter_video_files(prefix, VIDEO_EXT_TUPLE), 1):
+                        # Checked every 32 files; a cancelled walk stops soon enough
+                        if not count & 31 and cancel.is_set():
+                            break
+                        file_path = entry.path
+                        seen.add(file_path)
+                        try:
+                            # The one stat per file; DirEntry caches it and the
+                            # probe cache checks it too. Symlinks were already
+                            # skipped, so there is no link to follow
+                            file_stat = entry.stat(follow_symlinks=False)
+                            
+                            # Placeholder format from the extension until ffprobe answers
+                            format_info = entry.name.rpartition('.')[2].upper()
+                            
+                            pending_rows.append((file_path, file_stat.st_size, format_info))
+                            pending_stats.append(file_stat)
+                            
+                        except Exception as e:
+                            self.log_queue.put(('log', f"Error processing {file_path}: {str(e)}"))
+                            
+                        # Hand rows to the UI in batches to limit queue and widget traffic
+                        if (len(pending_rows) >= SCAN_BATCH_SIZE or
+                                time.monotonic() - last_flush >= SCAN_BATCH_INTERVAL):
+                            flush_rows()
+                            last_flush = time.monotonic()
+                            
+                    if pending_rows:
+                        flush_rows()
+            finally:
+                if self.probe_pool is not None:
+                    self.probe_pool.shutdown()
+                    self.probe_pool = None
                     
-        self.log_message(f"Found {len(self.video_files)} video files")
+            if cancel.is_set():
+                return  # Closing; seen is incomplete, so nothing may be pruned
+                
+            try:
+                # Deleted files would otherwise stay in the cache forever
+                self.probe_cache.prune(prefix, seen)
+                self.probe_cache.save()
+            except OSError as e:
+                self.log_queue.put(('log', f"Could not save probe cache: {str(e)}"))
+            self.log_queue.put(('status', f"Found {row_count} video files"))
+        except Exception as e:
+            # Rows found so far stay listed; nothing is pruned from the cache
+            self.log_queue.put(('log', f"Error scanning {prefix}: {str(e)}"))
+            self.log_queue.put(('status', f"Scan stopped after {row_count} video files"))
+        finally:
+            # Always sent, so the Scan button is enabled again
+            self.log_queue.put(('scan_done', None))
         
-    def get_video_info(self, file_path):
-        """Get video information using ffprobe"""
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', file_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            info = json.loads(result.stdout)
-            
-            # Extract format information
-            format_name = info.get('format', {}).get('format_name', 'Unknown')
-            return {'format': format_name.split(',')[0].upper()}
-            
-        except Exception:
-            return {'format': 'Unknown'}
+    def probe_video_formats(self, first_index, files, probe=True):
+        """Run ffprobe for a chunk of consecutive scanned (path, stat) pairs,
+        unless an earlier scan already did, and post the results to the UI
+        together. Without probe, only cached results are posted."""
+        if self.scan_cancel.is_set():
+            return
+        results = []
+        uncached = []
+        for index, (file_path, file_stat) in enumerate(files, first_index):
+            video_info = self.probe_cache.get(file_path, file_stat)
+            if video_info is None:
+                if probe:
+                    uncached.append((index, file_path, file_stat))
+            else:
+                results.append((index, video_info['format']))
+                
+        if uncached:
+            paths = [item[1] for item in uncached]
+            infos = None
+            pool = self.probe_pool
+            if pool is not None:
+                try:
+                    infos = list(pool.map(get_video_info, paths))
+                except Exception:
+                    # Shut down on close; probing here would delay the exit
+                    if self.scan_cancel.is_set():
+                        return
+                    # Otherwise the pool broke; probe on this thread
+            if infos is None:
+                infos = [get_video_info(path) for path in paths]
+            for (index, file_path, file_stat), video_info in zip(uncached, infos):
+                if video_info['format'] == 'Unknown':
+                    continue  # Not cached, so a later scan tries again
+                self.probe_cache.record(file_path, file_stat, video_info)
+                results.append((index, video_info['format']))
+        if results:
+            self.log_queue.put(('update_formats', results))
             
     def start_conversion(self):
         """Start the conversion process in a separate thread"""
@@ -247,76 +1067,321 @@ class VideoConverter:
             messagebox.showwarning("Warning", "Conversion already in progress!")
             return
             
+        if self.is_scanning:
+            messagebox.showwarning("Warning", "Please wait for the scan to finish!")
+            return
+            
+        if self.detecting_encoder:
+            messagebox.showwarning("Warning", "Still checking for hardware encoders, please try again in a moment.")
+            return
+            
         if not self.video_files:
             messagebox.showwarning("Warning", "No videos to convert! Please scan for videos first.")
             return
             
+        # Settings are read once here; the workers use this snapshot
+        self.options = self.read_options()
+        
         # Create output directory
-        output_path = Path(self.output_folder.get())
+        output_path = Path(self.options['output_folder'])
         output_path.mkdir(parents=True, exist_ok=True)
         
         # Start conversion thread
         self.is_converting = True
+        self.ensure_polling()
         self.convert_button.config(state='disabled')
-        self.conversion_thread = threading.Thread(target=self.convert_videos)
+        self.scan_button.config(state='disabled')
+        self.conversion_thread = threading.Thread(target=self.convert_videos,
+                                                  args=(self.video_files,))
         self.conversion_thread.daemon = True
         self.conversion_thread.start()
         
-    def convert_videos(self):
-        """Convert all videos to iPhone-compatible format"""
-        total_files = len(self.video_files)
+    def read_options(self):
+        """Snapshot the conversion settings on the UI thread, so worker
+        threads neither touch Tk variables nor see changes mid-run"""
+        options = {
+            'output_folder': self.output_folder.get(),
+            'jobs': self.max_concurrent_var.get(),
+            'quality': self.quality_var.get(),
+            'resolution': self.resolution_var.get(),
+            'speed': self.speed_var.get(),
+            'tune': self.tune_var.get(),
+            'extra_copy': self.extra_copy_var.get(),
+            'codec': self.codec_var.get(),
+        }
+        # Derived once instead of for every file
+        codec = options['codec']
+        if codec != 'h264':
+            options['encoder'] = CODEC_ENCODERS[codec]
+        elif self.hw_encoder and not self.force_software_var.get():
+            options['encoder'] = self.hw_encoder
+        else:
+            options['encoder'] = 'libx264'
+        if self.fragmented_var.get():
+            options['movflags'] = '+frag_keyframe+empty_moov+default_base_moof'
+        else:
+            options['movflags'] = '+faststart'
+        return options
         
-        for i, video_info in enumerate(self.video_files):
-            if not self.is_converting:  # Check if conversion was cancelled
-                break
-                
+    def convert_videos(self, table):
+        """Convert all videos in table, the scanned files when the
+        conversion started, to iPhone-compatible format"""
+        total_files = len(table)
+        
+        # Per-file completion fractions, summed for the overall progress bar
+        self.file_progress = array('d', bytes(8 * total_files))
+        self.progress_total = 0.0
+        # When each file's row last showed its percentage
+        self.row_progress_time = array('d', bytes(8 * total_files))
+        
+        try:
+            # With fewer jobs than workers, run only as many workers as there
+            # are jobs so each encoder's thread share covers all the cores
+            jobs = self.plan_jobs(table)
+            self.options['jobs'] = max(1, min(self.options['jobs'], len(jobs)))
+            
+            # Run several ffmpeg processes at once; files are independent
+            with ThreadPoolExecutor(max_workers=self.options['jobs']) as executor:
+                futures = {}
+                for job in jobs:
+                    if len(job) == 1:
+                        futures[executor.submit(self.convert_video_job, table, job[0])] = job
+                    else:
+                        futures[executor.submit(self.convert_batch_job, table, job)] = job
+                        
+                for future in as_completed(futures):
+                    try:
+                        statuses = future.result()
+                    except Exception as e:
+                        self.log_queue.put(('log', f"Error converting files: {str(e)}"))
+                        statuses = dict.fromkeys(futures[future], 'Failed')
+                    
+                    # Update progress and status in treeview
+                    for i in futures[future]:
+                        if i in statuses:
+                            self.log_queue.put(('update_tree', (i, statuses[i])))
+                        self.update_file_progress(i, 1.0)
+                    
+            self.save_conversion_cache()
+            
+            # Conversion complete
+            self.log_queue.put(('progress', 100))
+            self.log_queue.put(('status', 'Conversion complete!'))
+        finally:
+            # Always unlock the UI, even if the conversion thread fails
+            self.log_queue.put(('conversion_done', None))
+        
+    def plan_jobs(self, table):
+        """Split the files into jobs: lists of indices run by one worker.
+        Short libx264 clips are grouped into batches for one ffmpeg process
+        each; every other file is a job of its own. The largest jobs come
+        first, so a big file doesn't start last and run on alone."""
+        self.output_files = self.plan_output_files(table)
+        sizes = table.sizes
+        if self.options['encoder'] != 'libx264' or self.options['extra_copy'] != "None":
+            return sorted(([i] for i in range(len(table))), key=lambda job: -sizes[job[0]])
+            
+        jobs = []
+        short_clips = []
+        for i, path in enumerate(table.paths):
             try:
-                # Update progress
-                progress = (i / total_files) * 100
-                self.log_queue.put(('progress', progress))
-                self.log_queue.put(('status', f"Converting {i+1}/{total_files}: {Path(video_info['path']).name}"))
-                
-                # Convert video
-                success = self.convert_single_video(video_info)
+                video_info = self.probe_cache.get(path, os.stat(path))
+            except OSError:
+                video_info = None
+            duration = video_info['duration'] if video_info else None
+            if duration and duration < SHORT_CLIP_DURATION:
+                short_clips.append(i)
+            else:
+                jobs.append([i])
                 
-                # Update status in treeview
-                status = 'Converted' if success else 'Failed'
-                self.log_queue.put(('update_tree', i, status))
-                
-            except Exception as e:
-                self.log_queue.put(('log', f"Error converting {video_info['path']}: {str(e)}"))
-                self.log_queue.put(('update_tree', i, 'Failed'))
+        # Smaller batches when there are few clips, so all workers get some
+        size = max(1, min(CLIP_BATCH_SIZE, -(-len(short_clips) // self.options['jobs'])))
+        jobs.extend(short_clips[k:k + size] for k in range(0, len(short_clips), size))
+        jobs.sort(key=lambda job: -sum(sizes[i] for i in job))
+        return jobs
+        
+    def plan_output_files(self, table):
+        """Output path for every row. Sources that would share an output,
+        such as IMG_0001.MOV and IMG_0001.MP4, would overwrite each other
+        when converted at the same time, so later ones get their source
+        extension added to the name."""
+        output_files = []
+        taken = set()
+        for i in range(len(table)):
+            output_file = self.get_output_file(table, i)
+            # Compared without case, since Windows and macOS folders ignore it
+            key = str(output_file).lower()
+            if key in taken:
+                extension = Path(table.paths[i]).suffix.lstrip('.').lower()
+                stem = f"{output_file.stem}_{extension}"
+                count = 1
+                renamed = output_file.with_name(stem + '.mp4')
+                while str(renamed).lower() in taken:
+                    count += 1
+                    renamed = output_file.with_name(f"{stem}_{count}.mp4")
+                self.log_queue.put(('log', f"Warning: {table.relative_path(i)} has the same output "
+                                           f"name as another video, saving it as {renamed.name}"))
+                output_file = renamed
+                key = str(output_file).lower()
+            taken.add(key)
+            output_files.append(output_file)
+        return output_files
+        
+    def convert_video_job(self, table, i):
+        """Convert one file on a worker thread, returning {index: tree status}"""
+        if not self.is_converting:  # Check if conversion was cancelled
+            return {}
+            
+        path = f"file {i + 1}"  # Named in the error if the lookup fails
+        try:
+            path = table.paths[i]
+            self.log_queue.put(('status', f"Converting {i+1}/{len(table)}: {os.path.basename(path)}"))
+            
+            # Convert video
+            success = self.convert_single_video(
+                table, i, lambda fraction: self.update_file_progress(i, fraction))
+            return {i: 'Converted' if success else 'Failed'}
+            
+        except Exception as e:
+            self.log_queue.put(('log', f"Error converting {path}: {str(e)}"))
+            return {i: 'Failed'}
+            
+    def convert_batch_job(self, table, indices):
+        """Encode a batch of short clips with one ffmpeg process, returning
+        {index: tree status}. Clips that are already converted or can be
+        stream copied, and all of them if the batch fails, go through
+        convert_video_job instead."""
+        if not self.is_converting:
+            return {}
+            
+        batch = []
+        singles = []
+        try:
+            for i in indices:
+                input_path = Path(table.paths[i])
+                input_stat = input_path.stat()
+                output_file = self.output_files[i]
+                video_info = self.probe_cache.get(str(input_path), input_stat)
+                if (video_info is None or self.can_stream_copy(video_info) or
+                        self.conversion_cache.is_converted(input_path, input_stat, output_file)):
+                    singles.append(i)
+                else:
+                    batch.append((i, input_path, output_file, input_stat, video_info['duration']))
+        except Exception:
+            # Let the single-file path report the error for each file
+            return self.convert_jobs_singly(table, indices)
+            
+        statuses = {}
+        if len(batch) > 1:
+            self.log_queue.put(('status', f"Converting {len(batch)} short clips"))
+            try:
+                self.encode_batch(batch)
+                for i, input_path, output_file, input_stat, _ in batch:
+                    self.conversion_cache.record(input_path, input_stat, output_file)
+            except (subprocess.CalledProcessError, OSError):
+                self.log_queue.put(('log', f"Batch of {len(batch)} clips failed, converting them one at a time"))
+                singles.extend(i for i, *_ in batch)
+            else:
+                for i, input_path, *_ in batch:
+                    self.log_queue.put(('log', f"Successfully converted {input_path.name}"))
+                    statuses[i] = 'Converted'
+        else:
+            singles.extend(i for i, *_ in batch)
+            
+        statuses.update(self.convert_jobs_singly(table, sorted(singles)))
+        return statuses
+        
+    def convert_jobs_singly(self, table, indices):
+        """Run convert_video_job for each index, merging the statuses"""
+        statuses = {}
+        for i in indices:
+            statuses.update(self.convert_video_job(table, i))
+        return statuses
+        
+    def encode_batch(self, batch):
+        """Encode (index, input, output, stat, duration) clips with one
+        libx264 ffmpeg process, one input and output pair per clip"""
+        # The job's thread share is divided between the clips' encoders
+        threads = max(1, self.libx264_threads() // len(batch))
+        cmd = [FFMPEG]
+        for _, input_path, _, _, _ in batch:
+            cmd.extend(['-i', str(input_path)])
+        cmd.append('-y')
+        for k, (_, input_path, output_file, _, _) in enumerate(batch):
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            # Reuse the single-file output options, which follow '-y'
+            single = self.build_ffmpeg_command(str(input_path), str(output_file), hw_decode=False,
+                                               threads=threads, short_clip=True)
+            cmd.extend(['-map', f'{k}:v:0', '-map', f'{k}:a:0?'])
+            cmd.extend(single[single.index('-y') + 1:])
+            
+        def report(fraction):
+            for i, *_ in batch:
+                self.update_file_progress(i, fraction)
                 
-        # Conversion complete
-        self.log_queue.put(('progress', 100))
-        self.log_queue.put(('status', 'Conversion complete!'))
-        self.log_queue.put(('conversion_done', None))
-        
-    def convert_single_video(self, video_info):
-        """Convert a single video file"""
-        input_path = Path(video_info['path'])
-        source_path = Path(self.source_folder.get())
-        output_path = Path(self.output_folder.get())
+        self.log_queue.put(('log', "Converting " + ', '.join(item[1].name for item in batch) + "..."))
+        self.run_ffmpeg(cmd, max(item[4] for item in batch), report)
+        
+    def get_output_file(self, table, i):
+        """Output path for row i of table, mirroring its place under the
+        folder that was scanned, even if Source Folder changed since"""
+        relative_path = Path(table.relative_path(i))
+        return Path(self.options['output_folder']) / relative_path.with_suffix('.mp4')
+            
+    def save_conversion_cache(self):
+        """Persist the conversion cache, reporting failures in the log"""
+        try:
+            self.conversion_cache.save()
+        except OSError as e:
+            self.log_queue.put(('log', f"Could not save conversion cache: {str(e)}"))
+            
+    def update_file_progress(self, i, fraction):
+        """Record one file's progress and post the overall percentage,
+        and the file's own percentage at most every ROW_PROGRESS_INTERVAL"""
+        now = time.monotonic()
+        with self.progress_lock:
+            self.progress_total += fraction - self.file_progress[i]
+            self.file_progress[i] = fraction
+            progress = self.progress_total / len(self.file_progress) * 100
+            # A finished file gets its final status from convert_videos
+            show_row = fraction < 1.0 and now - self.row_progress_time[i] >= ROW_PROGRESS_INTERVAL
+            if show_row:
+                self.row_progress_time[i] = now
+        self.log_queue.put(('progress', progress))
+        if show_row:
+            self.log_queue.put(('update_tree', (i, f"{int(fraction * 100)}%")))
+        
+    def convert_single_video(self, table, i, on_progress=None):
+        """Convert a single video file, row i of table"""
+        input_path = Path(table.paths[i])
         
         # Create relative path structure in output folder
-        relative_path = input_path.relative_to(source_path)
-        output_file = output_path / relative_path.with_suffix('.mp4')
+        output_file = self.output_files[i]
         
         # Create output directory
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # Skip if already exists
-        if output_file.exists():
-            self.log_queue.put(('log', f"Skipping {input_path.name} - already exists"))
+        extra_outputs = self.get_extra_outputs(output_file)
+        
+        # Skip if this exact source was already converted to a complete file
+        input_stat = input_path.stat()
+        if (self.conversion_cache.is_converted(input_path, input_stat, output_file) and
+                all(os.path.exists(path) for _, path in extra_outputs)):
+            self.log_queue.put(('log', f"Skipping {input_path.name} - already converted"))
             return True
             
-        # Build ffmpeg command for iPhone compatibility
-        cmd = self.build_ffmpeg_command(str(input_path), str(output_file))
+        # Stream details and duration, probed now if the scan didn't
+        video_info = self.probe_cache.get(str(input_path), input_stat)
+        if video_info is None:
+            video_info = get_video_info(str(input_path))
+        duration = video_info['duration']
         
         try:
             # Run ffmpeg
             self.log_queue.put(('log', f"Converting {input_path.name}..."))
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            if extra_outputs or not self.stream_copy(input_path, output_file, video_info, on_progress):
+                self.encode_video(input_path, output_file, duration, extra_outputs, on_progress)
+            self.conversion_cache.record(input_path, input_stat, output_file)
             self.log_queue.put(('log', f"Successfully converted {input_path.name}"))
             return True
             
@@ -324,92 +1389,508 @@ class VideoConverter:
             self.log_queue.put(('log', f"Failed to convert {input_path.name}: {e.stderr}"))
             return False
             
-    def build_ffmpeg_command(self, input_file, output_file):
-        """Build ffmpeg command for iPhone compatibility"""
+    def encode_video(self, input_path, output_file, duration, extra_outputs, on_progress=None):
+        """Re-encode a video, retrying in a single pass or with CPU decoding
+        if the first attempt fails"""
+        # Build ffmpeg command for iPhone compatibility
+        short_clip = bool(duration) and duration < SHORT_CLIP_DURATION
+        cmd = self.build_ffmpeg_command(str(input_path), str(output_file),
+                                        extra_outputs=extra_outputs, short_clip=short_clip)
+        # Segmenting only handles a single output
+        segments = 1 if extra_outputs else self.segment_count(duration)
+        try:
+            if segments > 1:
+                self.encode_segmented(input_path, output_file, duration, segments, on_progress)
+            else:
+                self.run_ffmpeg(cmd, duration, on_progress)
+        except subprocess.CalledProcessError:
+            if segments > 1:
+                # Fall back to a single pass over the whole file
+                self.log_queue.put(('log', f"Segmented encoding failed for {input_path.name}, retrying"))
+                self.run_ffmpeg(cmd, duration, on_progress)
+            elif self.get_video_encoder() not in HW_DECODE_ARGS:
+                raise
+            else:
+                # The GPU can't decode every input, retry with CPU decoding
+                self.log_queue.put(('log', f"Hardware decoding failed for {input_path.name}, retrying"))
+                cmd = self.build_ffmpeg_command(str(input_path), str(output_file), hw_decode=False,
+                                                extra_outputs=extra_outputs, short_clip=short_clip)
+                self.run_ffmpeg(cmd, duration, on_progress)
+                
+    def can_stream_copy(self, video_info):
+        """True if the video stream already meets the output requirements,
+        so it can be copied instead of re-encoded"""
+        video = video_info.get('video')
+        if (self.options['codec'] != 'h264' or video is None or video['codec'] != 'h264' or
+                video['pix_fmt'] != 'yuv420p' or video['profile'] not in COPY_H264_PROFILES or
+                not 0 < video['level'] <= 42):
+            return False
+        resolution = self.options['resolution']
+        if resolution == "Original":
+            return True
+        # Compare the displayed size, as the scale filter sees it
+        width, height = video['width'], video['height']
+        if abs(video['rotation']) % 180 == 90:
+            width, height = height, width
+        max_width, max_height = (int(n) for n in resolution.split('x'))
+        return 0 < width <= max_width and 0 < height <= max_height
+        
+    def stream_copy(self, input_path, output_file, video_info, on_progress=None):
+        """Remux a video that needs no re-encoding, returning False if it
+        doesn't qualify or the copy fails"""
+        if not self.can_stream_copy(video_info):
+            return False
+        audio = ['-c:a', 'copy'] if video_info['audio_codec'] == 'aac' else \
+                ['-c:a', 'aac', '-ar', '44100', '-ab', '128k']
+        cmd = [FFMPEG, '-i', str(input_path), '-y', '-map', '0:v:0', '-map', '0:a:0?',
+               '-c:v', 'copy', '-tag:v', 'avc1'] + audio + \
+              ['-movflags', self.options['movflags'], str(output_file)]
+        try:
+            self.run_ffmpeg(cmd, video_info['duration'], on_progress)
+        except subprocess.CalledProcessError:
+            self.log_queue.put(('log', f"Stream copy failed for {input_path.name}, re-encoding"))
+            return False
+        self.log_queue.put(('log', f"Copied {input_path.name} without re-encoding"))
+        return True
+        
+    def segment_count(self, duration):
+        """Number of segments to split a libx264 encode into (1 = don't split)"""
+        if self.get_video_encoder() != 'libx264' or not duration:
+            return 1
+        return max(1, min(self.libx264_threads() // SEGMENT_MIN_THREADS,
+                          int(duration // SEGMENT_MIN_LENGTH)))
+        
+    def encode_segmented(self, input_path, output_file, duration, count, on_progress=None):
+        """Encode the video in count time segments at once, then join them
+        and encode the audio from the whole file in one pass"""
+        length = duration / count
+        # The job's share of the CPUs is divided between its segments
+        threads = max(1, self.libx264_threads() // count)
+        progress = [0.0] * count
+        
+        # Segments go to files rather than named pipes: the concat step
+        # reads them one after another, so piping would leave every encoder
+        # but the current one blocked on a full pipe. They are video only,
+        # so the extra pass is small next to the encode.
+        with tempfile.TemporaryDirectory(prefix='.segments-', dir=output_file.parent) as tmp:
+            def encode(k):
+                def report(fraction):
+                    progress[k] = fraction
+                    if on_progress:
+                        on_progress(sum(progress) / count)
+                # The last segment runs to the end so no frames are lost to rounding
+                segment = (k * length, length if k < count - 1 else None)
+                cmd = self.build_ffmpeg_command(str(input_path), os.path.join(tmp, f'seg{k:03d}.ts'),
+                                                hw_decode=False, segment=segment, threads=threads)
+                self.run_ffmpeg(cmd, length, report)
+                
+            with ThreadPoolExecutor(max_workers=count) as executor:
+                futures = [executor.submit(encode, k) for k in range(count)]
+                for future in futures:
+                    future.result()
+                    
+            # Names relative to the list file, so no quoting or -safe 0 needed
+            list_file = os.path.join(tmp, 'segments.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                f.writelines(f"file 'seg{k:03d}.ts'\n" for k in range(count))
+                
+            self.run_ffmpeg([
+                FFMPEG, '-f', 'concat', '-i', list_file, '-i', str(input_path), '-y',
+                '-map', '0:v', '-map', '1:a?', '-c:v', 'copy', '-c:a', 'aac',
+                '-ar', '44100', '-ab', '128k', '-movflags', self.options['movflags'], str(output_file)
+            ])
+            
+    def run_ffmpeg(self, cmd, duration=None, on_progress=None):
+        """Run ffmpeg, streaming its progress and tracking the process so it
+        can be stopped on quit"""
+        # Machine-readable key=value progress on stdout instead of stats on
+        # stderr, which then only carries actual errors
+        cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats', '-v', 'error'] + cmd[1:]
+        # Read as bytes: progress keys are ASCII, so lines are split without
+        # decoding them, and stderr is only decoded if the run fails
+        # Started under the lock so a stop either sees this process or
+        # prevents it, and a cancelled job's fallbacks start no new encodes
+        with self.active_procs_lock:
+            if not self.is_converting:
+                raise subprocess.CalledProcessError(1, cmd, None, 'Conversion stopped')
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       creationflags=NO_WINDOW)
+            self.active_procs.append(process)
+            
+        # Keep only the tail of stderr for error reporting
+        stderr_tail = deque(maxlen=20)
+        stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,))
+        stderr_thread.daemon = True
+        stderr_thread.start()
+        
+        # Each progress block has about a dozen lines; only the time and
+        # end markers matter, and progress is only reported in 0.5% steps
+        reported = -1
+        try:
+            for line in process.stdout:
+                if not on_progress or line[0] not in b'op':
+                    continue
+                key, _, value = line.rstrip().partition(b'=')
+                # out_time_ms is in microseconds despite its name, and is
+                # printed by every ffmpeg version (out_time_us is newer)
+                if key == b'out_time_ms' and duration:
+                    try:
+                        fraction = min(int(value) / 1000000 / duration, 1.0)
+                    except ValueError:
+                        continue  # N/A before the first frame is written
+                    step = int(fraction * 200)
+                    if step != reported:
+                        reported = step
+                        on_progress(fraction)
+                elif key == b'progress' and value == b'end':
+                    # Also completes files whose duration was unknown
+                    on_progress(1.0)
+            process.wait()
+            stderr_thread.join()
+        finally:
+            with self.active_procs_lock:
+                self.active_procs.remove(process)
+                
+        if process.returncode != 0:
+            stderr = b''.join(stderr_tail).decode('utf-8', 'replace')
+            raise subprocess.CalledProcessError(process.returncode, cmd, None, stderr)
+            
+    def stop_active_conversions(self):
+        """Terminate any running ffmpeg processes"""
+        with self.active_procs_lock:
+            for process in self.active_procs:
+                process.terminate()
+                
+    def libx264_threads(self):
+        """Threads for one software encode job (libx264, libx265 or
+        SVT-AV1), splitting the CPUs between the jobs running in parallel"""
+        return max(1, available_cpus() // self.options['jobs'])
+        
+    def build_ffmpeg_command(self, input_file, output_file, hw_decode=True,
+                             segment=None, threads=None, extra_outputs=(), short_clip=False):
+        """Build ffmpeg command for iPhone compatibility. segment is a
+        (start, length) pair in seconds to encode only that part of the
+        video to MPEG-TS, without audio; a length of None runs to the end.
+        extra_outputs holds (resolution, path) pairs encoded from the same
+        decode as the main output. short_clip tunes libx264 for clips
+        under SHORT_CLIP_DURATION."""
+        encoder = self.get_video_encoder()
+        # Decode on the same hardware, keeping frames on the GPU where the
+        # encoder and its scale filter support it
+        hw_decode = hw_decode and encoder in HW_DECODE_ARGS
+        hw_frames = hw_decode and encoder in HW_FRAME_ENCODERS
+        outputs = [(self.options['resolution'], output_file)] + list(extra_outputs)
+        
         # Base command
-        cmd = ['ffmpeg', '-i', input_file, '-y']  # -y to overwrite output files
+        cmd = [FFMPEG]
+        if hw_decode:
+            cmd.extend(HW_DECODE_ARGS[encoder])
+        if encoder == 'h264_vaapi':
+            cmd.extend(['-vaapi_device', VAAPI_DEVICE])
+        if segment:
+            # Seeking before -i is fast, and exact since the video is re-encoded
+            cmd.extend(['-ss', f'{segment[0]:.3f}'])
+        cmd.extend(['-i', input_file, '-y'])  # -y to overwrite output files
+        if segment and segment[1] is not None:
+            cmd.extend(['-t', f'{segment[1]:.3f}'])
         
+        # Encoding options, repeated for each output file
         # Video codec - H.264 for iPhone compatibility
-        cmd.extend(['-c:v', 'libx264'])
+        options = ['-c:v', encoder]
         
-        # Audio codec - AAC for iPhone compatibility
-        cmd.extend(['-c:a', 'aac'])
+        # Audio codec - AAC for iPhone compatibility (segments are joined
+        # with audio encoded from the whole file)
+        if segment:
+            options.append('-an')
+        else:
+            options.extend(['-c:a', 'aac'])
         
+        # Software encoders in the same process share the job's threads;
+        # hardware encoders run on the GPU and ignore thread counts
+        if encoder not in HW_ENCODER_ARGS:
+            threads = threads or max(1, self.libx264_threads() // len(outputs))
+            
         # Profile and level for iPhone compatibility
-        cmd.extend(['-profile:v', 'high', '-level', '4.0'])
-        
-        # Pixel format for iPhone compatibility
-        cmd.extend(['-pix_fmt', 'yuv420p'])
+        if encoder == 'libx264':
+            # No -level: x264 picks the lowest level that fits the output,
+            # which stays at or below 4.2 up to 1080p60
+            options.extend(['-profile:v', 'high', '-threads', str(threads)])
+            if short_clip:
+                options.extend(['-x264-params', SHORT_CLIP_X264_PARAMS])
+        elif encoder in SOFTWARE_ENCODER_ARGS:
+            options.extend(SOFTWARE_ENCODER_ARGS[encoder])
+            flag, params = SOFTWARE_ENCODER_PARAMS[encoder]
+            options.extend([flag, params.format(threads=threads)])
+        else:
+            options.extend(HW_ENCODER_ARGS[encoder])
+            
+        # Pixel format for iPhone compatibility (GPU frames are converted
+        # by the scale filters below)
+        if not hw_frames and encoder != 'h264_vaapi':
+            options.extend(['-pix_fmt', ENCODER_PIX_FMTS.get(encoder, 'yuv420p')])
         
         # Quality settings based on selection
-        quality_settings = {
-            'high': ['-crf', '18'],
-            'medium': ['-crf', '23'],
-            'low': ['-crf', '28']
-        }
-        cmd.extend(quality_settings[self.quality_var.get()])
-        
-        # Resolution scaling if needed
-        resolution = self.resolution_var.get()
-        if resolution != "Original":
-            cmd.extend(['-vf', f'scale={resolution}:force_original_aspect_ratio=decrease'])
+        options.extend(QUALITY_SETTINGS[encoder][self.options['quality']])
+        if encoder in ('libx264', 'libx265'):
+            # x265 takes the same preset names
+            options.extend(['-preset', self.options['speed']])
+        if encoder == 'libx264':
+            if self.options['tune'] != 'none':
+                options.extend(['-tune', self.options['tune']])
+                
+        if segment:
+            container = ['-f', 'mpegts']
+        else:
+            # Audio settings and movflags for iPhone compatibility
+            container = ['-ar', '44100', '-ab', '128k', '-movflags', self.options['movflags']]
             
-        # Audio settings
-        cmd.extend(['-ar', '44100', '-ab', '128k'])
-        
-        # Movflags for iPhone compatibility
-        cmd.extend(['-movflags', '+faststart'])
+        if len(outputs) == 1:
+            cmd.extend(options)
+            filters = scale_filters(encoder, hw_frames, outputs[0][0])
+            if filters:
+                cmd.extend(['-vf', ','.join(filters)])
+            cmd.extend(container)
+            cmd.append(output_file)
+            return cmd
+            
+        # Decode once and split the frames between the outputs
+        graph = [f"[0:v]split={len(outputs)}" + ''.join(f'[s{k}]' for k in range(len(outputs)))]
+        for k, (resolution, _) in enumerate(outputs):
+            filters = scale_filters(encoder, hw_frames, resolution) or ('null',)
+            graph.append(f"[s{k}]{','.join(filters)}[v{k}]")
+        cmd.extend(['-filter_complex', ';'.join(graph)])
+        for k, (_, path) in enumerate(outputs):
+            cmd.extend(['-map', f'[v{k}]', '-map', '0:a:0?'])
+            cmd.extend(options)
+            cmd.extend(container)
+            cmd.append(path)
+            
+        return cmd
         
-        # Output file
-        cmd.append(output_file)
+    def get_extra_outputs(self, output_file):
+        """(resolution, path) for each smaller companion copy enabled"""
+        extra_copy = self.options['extra_copy']
+        if extra_copy == "None":
+            return []
+        outputs = []
+        for resolution in extra_copy.split(' + '):
+            height = resolution.split('x')[1]
+            outputs.append((resolution, str(output_file.with_name(f"{output_file.stem}_{height}p.mp4"))))
+        return outputs
         
-        return cmd
+    def get_video_encoder(self):
+        """Return the encoder chosen when the conversion started"""
+        return self.options['encoder']
         
     def process_log_queue(self):
-        """Process messages from the conversion thread"""
+        """Process messages from the scan and conversion threads"""
+        # Log lines are inserted together, only the last progress and
+        # status values and the last status of each row are shown and
+        # scanned rows are put in the Treeview once, so a tick costs a few
+        # widget updates however many messages it drains
+        log_lines = []
+        latest = {}
+        row_statuses = {}
+        rows_added = False
+        drained = False
+        timestamp = time.strftime('%H:%M:%S')
         try:
-            while True:
-                message_type, data = self.log_queue.get_nowait()
-                
+            # Drain a bounded batch per tick so a flood of messages can't
+            # starve the event loop
+            for _ in range(LOG_QUEUE_BATCH):
+                try:
+                    message_type, data = self.log_queue.get_nowait()
+                except queue.Empty:
+                    drained = True
+                    break
                 if message_type == 'log':
-                    self.log_text.insert(tk.END, f"{datetime.now().strftime('%H:%M:%S')} - {data}\n")
-                    self.log_text.see(tk.END)
-                    
-                elif message_type == 'progress':
-                    self.progress_var.set(data)
-                    
-                elif message_type == 'status':
-                    self.status_var.set(data)
-                    
+                    log_lines.append(f"{timestamp} - {data}\n")
+                elif message_type in ('progress', 'status'):
+                    latest[message_type] = data
                 elif message_type == 'update_tree':
                     index, status = data
-                    if index < len(self.video_tree.get_children()):
-                        item = self.video_tree.get_children()[index]
-                        values = list(self.video_tree.item(item, 'values'))
-                        values[3] = status  # Update status column
-                        self.video_tree.item(item, values=values)
-                        
-                elif message_type == 'conversion_done':
-                    self.is_converting = False
-                    self.convert_button.config(state='normal')
-                    
-        except queue.Empty:
-            pass
+                    row_statuses[index] = status
+                elif message_type == 'add_tree_items':
+                    self.handle_message(message_type, data)
+                    rows_added = True
+                else:
+                    # Keep earlier lines ahead of anything this message logs
+                    self.append_log(log_lines)
+                    self.handle_message(message_type, data)
+            self.append_log(log_lines)
+            if rows_added:
+                self.show_rows()
+            for data in row_statuses.items():
+                self.handle_message('update_tree', data)
+            for message_type, data in latest.items():
+                self.handle_message(message_type, data)
+        finally:
+            # Keep polling while background work can post messages, sooner
+            # if this tick hit its batch limit; when idle, the next scan or
+            # conversion restarts it
+            if not drained:
+                self._poll_after = self.root.after(UI_BUSY_INTERVAL, self.process_log_queue)
+            elif self.is_scanning or self.is_converting or self.detecting_encoder:
+                self._poll_after = self.root.after(UI_UPDATE_INTERVAL, self.process_log_queue)
+            else:
+                self._poll_after = None
+                
+    def ensure_polling(self):
+        """Start draining the message queue if it is idle"""
+        if self._poll_after is None:
+            self._poll_after = self.root.after(UI_UPDATE_INTERVAL, self.process_log_queue)
+            
+    def handle_message(self, message_type, data):
+        """Apply one queued message to the UI"""
+        if message_type == 'log':
+            self.log_message(data)
+            
+        elif message_type == 'progress':
+            # Each write redraws the bar, and changes under 0.1% don't show
+            progress = round(data, 1)
+            if progress != self.progress_var.get():
+                self.progress_var.set(progress)
+            
+        elif message_type == 'status':
+            if data != self.status_var.get():
+                self.status_var.set(data)
+            
+        elif message_type == 'update_tree':
+            index, status = data
+            # The table holds the current status, so unchanged rows cost
+            # no Tcl call and changed ones update a single cell
+            if index < len(self.video_files) and self.video_files.statuses[index] != status:
+                self.video_files.statuses[index] = status
+                item = self.video_files.item_ids[index]
+                if item is not None:
+                    self.video_tree.set(item, 'Status', status)
+                
+        elif message_type == 'update_formats':
+            formats = self.video_files.formats
+            item_ids = self.video_files.item_ids
+            set_cell = self.video_tree.set
+            for index, format_name in data:
+                formats[index] = format_name
+                item = item_ids[index]
+                if item is not None:
+                    set_cell(item, 'Format', format_name)
+            
+        elif message_type == 'add_tree_items':
+            self.video_files.extend(data)
+            self.scan_slots.release()
+                
+        elif message_type == 'encoder_detected':
+            self.hw_encoder, jobs = data
+            if self.hw_encoder:
+                self.log_message(f"Using hardware encoder: {self.hw_encoder}")
+            else:
+                self.log_message("No hardware encoder found, using libx264")
+            if not self.jobs_chosen:
+                self.max_concurrent_var.set(jobs)
+            self.detecting_encoder = False
+            
+        elif message_type == 'scan_done':
+            self.is_scanning = False
+            self.scan_button.config(state='normal')
+            self.log_message(f"Found {len(self.video_files)} video files")
+            
+        elif message_type == 'conversion_done':
+            self.is_converting = False
+            self.convert_button.config(state='normal')
+            self.scan_button.config(state='normal')
+            
+    def show_rows(self):
+        """Insert table rows into the Treeview up to the current limit"""
+        table = self.video_files
+        end = min(self.tree_limit, len(table))
+        if end <= table.shown:
+            return
+        root_len = table.root_len
+        rows = tuple((table.paths[i][root_len:], f"{table.sizes[i] / (1024 * 1024):.1f}",
+                      table.formats[i], table.statuses[i])
+                     for i in range(table.shown, end))
+        tk_app = self.video_tree.tk
+        item_ids = tk_app.call(TREE_INSERT_PROC, str(self.video_tree), rows)
+        table.item_ids[table.shown:end] = tk_app.splitlist(item_ids)
+        table.shown = end
+        
+    def on_tree_scroll(self, first, last):
+        """Update the scrollbar and load the next page of rows once the
+        end of the list comes into view"""
+        self.tree_scrollbar.set(first, last)
+        if float(last) >= 1.0 and self.video_files.shown < len(self.video_files):
+            self.tree_limit = self.video_files.shown + TREE_PAGE_SIZE
+            self.root.after_idle(self.show_rows)
             
-        # Schedule next check
-        self.root.after(100, self.process_log_queue)
+    def schedule_save(self, *args):
+        """Debounce settings writes so typing in a folder field saves once"""
+        if self._save_after is not None:
+            self.root.after_cancel(self._save_after)
+        self._save_after = self.root.after(500, self.save_settings)
         
+    def on_jobs_changed(self):
+        """Remember that the user picked the job count, so it is saved and
+        no longer replaced by the detected default"""
+        self.jobs_chosen = True
+        self.schedule_save()
+        
+    def save_settings(self):
+        """Write the current folders and encoder options to the settings file"""
+        self._save_after = None
+        self.settings.set('source_folder', self.source_folder.get())
+        self.settings.set('output_folder', self.output_folder.get())
+        self.settings.set('speed', self.speed_var.get())
+        self.settings.set('tune', self.tune_var.get())
+        self.settings.set('fragmented_mp4', 'yes' if self.fragmented_var.get() else 'no')
+        self.settings.set('force_software', 'yes' if self.force_software_var.get() else 'no')
+        self.settings.set('quick_scan', 'yes' if self.quick_scan_var.get() else 'no')
+        self.settings.set('extra_copy', self.extra_copy_var.get())
+        self.settings.set('codec', self.codec_var.get())
+        if self.jobs_chosen:
+            self.settings.set('parallel_jobs', str(self.max_concurrent_var.get()))
+        try:
+            self.settings.save()
+        except OSError as e:
+            self.log_message(f"Could not save settings: {str(e)}")
+            
     def log_message(self, message):
         """Add a message to the log"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        self.log_text.insert(tk.END, f"{timestamp} - {message}\n")
-        self.log_text.see(tk.END)
+        timestamp = time.strftime('%H:%M:%S')
+        self.append_log([f"{timestamp} - {message}\n"])
+        
+    def append_log(self, lines):
+        """Insert finished log lines with a single insert and scroll, then
+        empty the list"""
+        if lines:
+            self.log_text.insert(tk.END, ''.join(lines))
+            self.log_text.see(tk.END)
+            lines.clear()
         
     def on_closing(self):
         """Handle application closing"""
+        # Flush a pending debounced save so the last change isn't lost
+        if self._save_after is not None:
+            self.root.after_cancel(self._save_after)
+            self.save_settings()
+            
+        # Keep the probes finished so far if a scan is cut short
+        if self.is_scanning:
+            self.scan_cancel.set()
+            self.scan_slots.release()  # Wake the walk if it waits on the UI
+            pool = self.probe_pool
+            if pool is not None:
+                # Drop queued probes so exiting doesn't wait for them
+                pool.shutdown(wait=False, cancel_futures=True)
+            try:
+                self.probe_cache.save()
+            except OSError:
+                pass
+                
         if self.is_converting:
             if messagebox.askokcancel("Quit", "Conversion in progress. Are you sure you want to quit?"):
                 self.is_converting = False
+                self.stop_active_conversions()
+                self.save_conversion_cache()
                 self.root.destroy()
         else:
             self.root.destroy()